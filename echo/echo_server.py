@@ -1,26 +1,26 @@
-import socket, sys, threading
+import asyncio, socket, sys
 
-def handle(conn, addr):
-    with conn:
-        while True:
-            data = conn.recv(4096)
-            if not data:
-                break
-            conn.sendall(data)
-
-def main(port):
-    s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-    s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-    s.bind(("0.0.0.0", port))
-    s.listen(5)
-    print(f"Echo server listening on 0.0.0.0:{port}")
+async def handle(reader, writer):
+    sock = writer.get_extra_info("socket")
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
     try:
-        while True:
-            conn, addr = s.accept()
-            t = threading.Thread(target=handle, args=(conn, addr), daemon=True)
-            t.start()
+        while data := await reader.read(4096):
+            writer.write(data)
+            await writer.drain()
+    except ConnectionError:
+        pass
     finally:
-        s.close()
+        writer.close()
+
+async def serve(port):
+    server = await asyncio.start_server(handle, "0.0.0.0", port, reuse_address=True)
+    print(f"Echo server listening on 0.0.0.0:{port}")
+    async with server:
+        await server.serve_forever()
+
+def main(port):
+    asyncio.run(serve(port))
 
 if __name__ == "__main__":
     port = int(sys.argv[1]) if len(sys.argv) > 1 else 9009
@@ -2,6 +2,7 @@
 """Generate docker-compose.yml with configurable number of secondaries."""
 import os
 import sys
+from string import Template
 
 # Configuration from environment or defaults
 NUM_SECONDARIES = int(os.environ.get("NUM_SECONDARIES", "2"))
@@ -13,31 +14,15 @@ SECONDARY_DELAYS = os.environ.get("SECONDARY_DELAYS", "0,1500").split(",")
 # For 5 nodes: 8001, 8002, 8003, 8004, 8005
 SECONDARY_START_PORT = 8001
 
-# Build SECONDARIES list for master
-secondaries_list = []
-depends_on = []
-services = []
-
-for i in range(1, NUM_SECONDARIES + 1):
-    secondary_name = f"secondary{i}"
-    # Port calculation: 8001 + (i - 1)
-    # i=1 -> 8001, i=2 -> 8002, i=3 -> 8003, etc.
-    host_port = SECONDARY_START_PORT + (i - 1)
-    delay = int(SECONDARY_DELAYS[i - 1]) if i - 1 < len(SECONDARY_DELAYS) else 0
-
-    secondaries_list.append(f"http://{secondary_name}:8001")
-    depends_on.append(f"      - {secondary_name}")
-
-    container_name = f"rl-secondary-{i}"
-    services.append(f"""  {secondary_name}:
+SECONDARY_TEMPLATE = Template("""  secondary$i:
     build: ./secondary
-    container_name: {container_name}
+    container_name: rl-secondary-$i
     environment:
       - PORT=8001
-      - DELAY_MS={delay}
+      - DELAY_MS=$delay
       - LOG_LEVEL=INFO
     ports:
-      - "{host_port}:8001"
+      - "$host_port:8001"
     healthcheck:
       test: ["CMD", "curl", "-f", "http://localhost:8001/health"]
       interval: 5s
@@ -46,28 +31,49 @@ for i in range(1, NUM_SECONDARIES + 1):
       start_period: 10s
 """)
 
-# Generate docker-compose.yml
-compose_content = f"""services:
+MASTER_TEMPLATE = Template("""services:
   master:
     build: ./master
     container_name: rl-master
     environment:
       - HOST=0.0.0.0
-      - PORT={MASTER_PORT}
-      - SECONDARIES={",".join(secondaries_list)}
+      - PORT=$master_port
+      - SECONDARIES=$secondaries
       - LOG_LEVEL=INFO
     ports:
-      - "{MASTER_PORT}:{MASTER_PORT}"
+      - "$master_port:$master_port"
     depends_on:
-{chr(10).join(depends_on)}
+$depends_on
     healthcheck:
-      test: ["CMD", "curl", "-f", "http://localhost:{MASTER_PORT}/health"]
+      test: ["CMD", "curl", "-f", "http://localhost:$master_port/health"]
       interval: 5s
       timeout: 3s
       retries: 3
       start_period: 10s
 
-{chr(10).join(services)}"""
+$services""")
+
+
+def secondary_delay(i):
+    return int(SECONDARY_DELAYS[i - 1]) if i - 1 < len(SECONDARY_DELAYS) else 0
+
+
+indices = range(1, NUM_SECONDARIES + 1)
+
+# Port calculation: 8001 + (i - 1)
+# i=1 -> 8001, i=2 -> 8002, i=3 -> 8003, etc.
+services = [
+    SECONDARY_TEMPLATE.substitute(i=i, delay=secondary_delay(i), host_port=SECONDARY_START_PORT + (i - 1))
+    for i in indices
+]
+
+# Generate docker-compose.yml
+compose_content = MASTER_TEMPLATE.substitute(
+    master_port=MASTER_PORT,
+    secondaries=",".join(f"http://secondary{i}:8001" for i in indices),
+    depends_on="\n".join(f"      - secondary{i}" for i in indices),
+    services="\n".join(services),
+)
 
 # Write to file
 with open("docker-compose.yml", "w") as f:
@@ -1,33 +1,100 @@
 import os
+import gzip
+import socket
+import struct
+import tempfile
 import time
+import queue
+import itertools
+import atexit
 import logging
+from logging.handlers import QueueHandler, QueueListener
 import threading
-from typing import List, Tuple, Dict
+from typing import Iterable, Iterator, List, Optional, Tuple, Dict
 from enum import Enum
 from collections import defaultdict
 from dataclasses import dataclass, field
-from flask import Flask, request, jsonify
+from flask import Flask, request
+import orjson
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection
 
 app = Flask(__name__)
 
 log_level = os.environ.get("LOG_LEVEL", "INFO").upper()
+# Request threads only enqueue log records; a listener thread does the formatting and I/O
+_log_queue: "queue.Queue[logging.LogRecord]" = queue.Queue()
+_log_handler = logging.StreamHandler()
+_log_handler.setFormatter(logging.Formatter("%(asctime)s | %(levelname)s | %(message)s"))
 logging.basicConfig(level=getattr(logging, log_level, logging.INFO),
-                    format="%(asctime)s | %(levelname)s | %(message)s")
+                    format="%(message)s", handlers=[QueueHandler(_log_queue)])
+LOG_LISTENER = QueueListener(_log_queue, _log_handler)
+LOG_LISTENER.start()
+atexit.register(LOG_LISTENER.stop)
 logger = logging.getLogger("master")
 
+
+def _json_response(obj, status: int = 200):
+    return app.response_class(orjson.dumps(obj), status=status, mimetype="application/json")
+
+
+def _request_json() -> dict:
+    try:
+        data = orjson.loads(request.get_data())
+    except orjson.JSONDecodeError:
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
 # Messages stored with sequence numbers for ordering and deduplication
 MESSAGES: List[Tuple[int, str]] = []
-SEQ_COUNTER = 0
+SEQ_NEXT = itertools.count(1).__next__
+# Held while a message is numbered, appended and enqueued so all three happen in seq order
 SEQ_LOCK = threading.Lock()
 SECONDARIES = [u.strip() for u in os.environ.get("SECONDARIES", "").split(",") if u.strip()]
+REPLICATE_URLS = {sec: f"{sec}/replicate" for sec in SECONDARIES}
+HEALTH_URLS = {sec: f"{sec}/health" for sec in SECONDARIES}
+
+
+class KeepAliveAdapter(HTTPAdapter):
+    """HTTPAdapter whose sockets enable TCP keepalive (urllib3 already sets TCP_NODELAY)."""
+
+    SOCKET_OPTIONS = HTTPConnection.default_socket_options + [
+        (socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1),
+    ]
+
+    def init_poolmanager(self, *args, **kwargs):
+        kwargs["socket_options"] = self.SOCKET_OPTIONS
+        super().init_poolmanager(*args, **kwargs)
+
+
+# Shared HTTP session so connections to each secondary are kept alive and reused
+SESSION = requests.Session()
+_adapter = KeepAliveAdapter(pool_connections=max(8, len(SECONDARIES)), pool_maxsize=64, max_retries=0)
+SESSION.mount("http://", _adapter)
+SESSION.mount("https://", _adapter)
 
 HOST = os.environ.get("HOST", "0.0.0.0")  # nosec B104 - Dockerized app needs to bind to all interfaces
 PORT = int(os.environ.get("PORT", "8000"))
 
 # Replication queues per secondary
-REPLICATION_QUEUES: Dict[str, List[Tuple[int, str]]] = {sec: [] for sec in SECONDARIES}
-REPLICATION_LOCK = threading.Lock()
+REPLICATION_QUEUES: Dict[str, "queue.Queue[Tuple[int, str]]"] = {sec: queue.Queue() for sec in SECONDARIES}
+
+# Upper bounds on how many queued messages one /replicate call carries
+REPL_BATCH_MAX = int(os.environ.get("REPL_BATCH_MAX", "64"))
+REPL_BATCH_BYTES = int(os.environ.get("REPL_BATCH_BYTES", str(64 * 1024)))
+# How long a worker lingers for more messages after the first; 0 sends immediately
+REPL_BATCH_INTERVAL = float(os.environ.get("REPL_BATCH_INTERVAL_MS", "0")) / 1000.0
+
+# Replication bodies larger than this are gzip-compressed on the wire
+REPL_COMPRESS_MIN_BYTES = int(os.environ.get("REPL_COMPRESS_MIN_BYTES", "1024"))
+
+RETRY_BACKOFF_MIN = float(os.environ.get("RETRY_BACKOFF_MIN", "0.2"))
+RETRY_BACKOFF_MAX = float(os.environ.get("RETRY_BACKOFF_MAX", "2.0"))
+
+# Bit position of each secondary in AckTracker.mask
+SEC_INDEX: Dict[str, int] = {sec: i for i, sec in enumerate(SECONDARIES)}
 
 # Track last delivered seq per secondary
 DELIVERED_SEQ: Dict[str, int] = defaultdict(int)
@@ -36,9 +103,15 @@ DELIVERED_SEQ: Dict[str, int] = defaultdict(int)
 @dataclass
 class AckTracker:
     required_acks: int
-    acked_by: set = field(default_factory=set)
+    mask: int = 0  # bit i is set once SECONDARIES[i] has acked
     event: threading.Event = field(default_factory=threading.Event)
 
+    def ack_count(self) -> int:
+        return self.mask.bit_count()
+
+    def acked_by(self) -> List[str]:
+        return [sec for i, sec in enumerate(SECONDARIES) if self.mask >> i & 1]
+
 ACK_TRACKERS: Dict[int, AckTracker] = {}
 ACK_LOCK = threading.Lock()
 
@@ -54,26 +127,48 @@ HB_TIMEOUT = float(os.environ.get("HEARTBEAT_TIMEOUT", "5.0"))
 SUSPECT_THRESH = int(os.environ.get("SUSPECTED_THRESHOLD", "2"))
 UNHEALTHY_THRESH = int(os.environ.get("UNHEALTHY_THRESHOLD", "5"))
 
+# Filled once at import; each record carries its own "lock" for updates
 SECONDARY_STATUS: Dict[str, Dict] = {}
-STATUS_LOCK = threading.Lock()
+HAS_QUORUM = True  # all secondaries start out healthy
+QUORUM_LOCK = threading.Lock()  # serializes heartbeat threads recomputing HAS_QUORUM
+
+def _new_status() -> Dict:
+    status_info = {
+        "status": SecondaryStatus.HEALTHY,
+        "last_heartbeat": time.time(),
+        "failures": 0,
+        "last_success": time.time(),
+        "last_ack": float("-inf"),  # time.monotonic() of the latest replication ACK
+        "recovered": threading.Event(),  # set (then replaced) when the secondary turns healthy again
+        "lock": threading.Lock(),
+    }
+    _publish_status(status_info)
+    return status_info
+
+
+def _publish_status(status_info: Dict):
+    """Swap in a fresh read-only view of the record; readers load it without locking"""
+    status_info["view"] = {
+        "status": status_info["status"].value,
+        "last_heartbeat": status_info["last_heartbeat"],
+        "failures": status_info["failures"],
+        "last_success": status_info["last_success"]
+    }
 
 
 def init_secondary_statuses():
-    with STATUS_LOCK:
-        for sec_url in SECONDARIES:
-            if sec_url not in SECONDARY_STATUS:
-                SECONDARY_STATUS[sec_url] = {
-                    "status": SecondaryStatus.HEALTHY,
-                    "last_heartbeat": time.time(),
-                    "failures": 0,
-                    "last_success": time.time()
-                }
-                logger.info("Heartbeat: %s initialized as healthy", sec_url)
+    for sec_url in SECONDARIES:
+        SECONDARY_STATUS[sec_url] = _new_status()
+        logger.info("Heartbeat: %s initialized as healthy", sec_url)
+
+
+# SECONDARIES is fixed at startup, so the records never need creating on a request path
+init_secondary_statuses()
 
 
 def check_secondary_health(sec_url: str) -> bool:
     try:
-        response = requests.get(f"{sec_url}/health", timeout=HB_TIMEOUT)
+        response = SESSION.get(HEALTH_URLS[sec_url], timeout=HB_TIMEOUT)
         response.raise_for_status()
         return True
     except Exception as e:
@@ -82,17 +177,8 @@ def check_secondary_health(sec_url: str) -> bool:
 
 
 def update_secondary_status(sec_url: str, is_healthy: bool):
-    with STATUS_LOCK:
-        if sec_url not in SECONDARY_STATUS:
-            SECONDARY_STATUS[sec_url] = {
-                "status": SecondaryStatus.HEALTHY,
-                "last_heartbeat": time.time(),
-                "failures": 0,
-                "last_success": time.time()
-            }
-            logger.info("Heartbeat: %s initialized as healthy", sec_url)
-
-        status_info = SECONDARY_STATUS[sec_url]
+    status_info = SECONDARY_STATUS[sec_url]
+    with status_info["lock"]:
         status_info["last_heartbeat"] = time.time()
 
         if is_healthy:
@@ -108,6 +194,9 @@ def update_secondary_status(sec_url: str, is_healthy: bool):
                 else:
                     logger.info("Heartbeat OK for %s: %s -> healthy", sec_url, old_status.value)
                 status_info["status"] = SecondaryStatus.HEALTHY
+                # Wake a replication worker backing off on this secondary
+                status_info["recovered"].set()
+                status_info["recovered"] = threading.Event()
         else:
             status_info["failures"] += 1
             failures = status_info["failures"]
@@ -125,69 +214,122 @@ def update_secondary_status(sec_url: str, is_healthy: bool):
                 # Still failing, remain unhealthy
                 pass
 
+        _publish_status(status_info)
 
-def heartbeat_worker():
-    init_secondary_statuses()
-    logger.info("Heartbeat worker started (interval=%.1fs)", HB_INTERVAL)
+    refresh_quorum()
 
-    while True:
-        time.sleep(HB_INTERVAL)
-        for sec_url in SECONDARIES:
-            is_healthy = check_secondary_health(sec_url)
-            update_secondary_status(sec_url, is_healthy)
 
+def refresh_quorum():
+    """Recompute HAS_QUORUM from the current status of every secondary"""
+    global HAS_QUORUM
+    if not SECONDARIES:
+        HAS_QUORUM = True
+        return
+
+    with QUORUM_LOCK:
+        healthy_count = sum(
+            1 for sec in SECONDARIES
+            if SECONDARY_STATUS.get(sec, {}).get("status", SecondaryStatus.HEALTHY) == SecondaryStatus.HEALTHY
+        )
 
-heartbeat_thread = threading.Thread(target=heartbeat_worker, daemon=True)
-heartbeat_thread.start()
+        majority = (len(SECONDARIES) + 1) // 2 + 1
+        quorum = 1 + healthy_count
+        HAS_QUORUM = quorum >= majority
 
 
-def replication_worker(sec: str):
-    """Background worker that retries replication to a specific secondary"""
+def heartbeat_worker(sec_url: str):
+    """Probe one secondary on its own schedule so a slow peer can't delay the others"""
+    logger.info("Heartbeat worker started for %s (interval=%.1fs)", sec_url, HB_INTERVAL)
+    status_info = SECONDARY_STATUS[sec_url]
+
     while True:
-        seq_msg = None
-        with REPLICATION_LOCK:
-            q = REPLICATION_QUEUES.get(sec, [])
-            if q:
-                seq_msg = q[0]
+        time.sleep(HB_INTERVAL)
+        # A replication ACK within the last interval already proves the peer is alive
+        recently_acked = time.monotonic() - status_info["last_ack"] < HB_INTERVAL
+        update_secondary_status(sec_url, recently_acked or check_secondary_health(sec_url))
 
-        if seq_msg is None:
-            time.sleep(0.05)
-            continue
 
-        seq, msg = seq_msg
+def start_heartbeat_workers():
+    """Start a daemon heartbeat thread for each secondary"""
+    for sec in SECONDARIES:
+        t = threading.Thread(target=heartbeat_worker, args=(sec,), daemon=True)
+        t.start()
+
 
-        # Track replication attempts
-        attempt_count = DELIVERED_SEQ.get(f"{sec}_attempts_{seq}", 0) + 1
-        DELIVERED_SEQ[f"{sec}_attempts_{seq}"] = attempt_count
-        logger.info("Replication attempt %d to %s for seq=%d", attempt_count, sec, seq)
+start_heartbeat_workers()
 
+
+def next_batch(q: "queue.Queue[Tuple[int, str]]") -> List[Tuple[int, str]]:
+    """Block for one message, then collect more (lingering up to REPL_BATCH_INTERVAL) up to the batch limits"""
+    batch = [q.get()]
+    size = len(batch[0][1])
+    deadline = time.monotonic() + REPL_BATCH_INTERVAL
+    while len(batch) < REPL_BATCH_MAX and size < REPL_BATCH_BYTES:
         try:
-            r = requests.post(f"{sec}/replicate", json={"msg": msg, "seq": seq}, timeout=2.0)
-            if r.status_code == 200:
-                data = r.json()
-                if data.get("status") == "ok":
-                    with REPLICATION_LOCK:
-                        q = REPLICATION_QUEUES.get(sec, [])
-                        if q and q[0] == seq_msg:
-                            q.pop(0)
-
-                    DELIVERED_SEQ[sec] = max(DELIVERED_SEQ[sec], seq)
-                    # Clean up attempt counter
-                    DELIVERED_SEQ.pop(f"{sec}_attempts_{seq}", None)
-
-                    with ACK_LOCK:
-                        tracker = ACK_TRACKERS.get(seq)
-                        if tracker and sec not in tracker.acked_by:
-                            tracker.acked_by.add(sec)
-                            if len(tracker.acked_by) >= tracker.required_acks:
-                                tracker.event.set()
-                else:
-                    time.sleep(0.2)
+            remaining = deadline - time.monotonic()
+            item = q.get(timeout=remaining) if remaining > 0 else q.get_nowait()
+        except queue.Empty:
+            break
+        batch.append(item)
+        size += len(item[1])
+    return batch
+
+
+def encode_batch(batch: List[Tuple[int, str]]) -> Tuple[bytes, Dict[str, str]]:
+    """Serialize a batch for /replicate, gzip-compressing it when it is large"""
+    body = orjson.dumps({"batch": [{"seq": seq, "msg": msg} for seq, msg in batch]})
+    headers = {"Content-Type": "application/json"}
+    if len(body) > REPL_COMPRESS_MIN_BYTES:
+        body = gzip.compress(body, compresslevel=3)
+        headers["Content-Encoding"] = "gzip"
+    return body, headers
+
+
+def replication_worker(sec: str):
+    """Background worker that retries replication to a specific secondary"""
+    q = REPLICATION_QUEUES[sec]
+    url = REPLICATE_URLS[sec]
+    status_info = SECONDARY_STATUS[sec]
+    while True:
+        batch = next_batch(q)
+        first_seq, last_seq = batch[0][0], batch[-1][0]
+        body, headers = encode_batch(batch)
+        backoff = RETRY_BACKOFF_MIN
+        attempt_count = 0
+
+        # Keep retrying the same batch so each secondary receives messages in seq order
+        while True:
+            attempt_count += 1
+            recovered = status_info["recovered"]
+            logger.debug("Replication attempt %d to %s for seq=%d..%d (%d msgs)",
+                        attempt_count, sec, first_seq, last_seq, len(batch))
+
+            try:
+                r = SESSION.post(url, data=body, headers=headers, timeout=2.0)
+                if r.status_code == 200 and orjson.loads(r.content).get("status") == "ok":
+                    break
+            except Exception as e:
+                logger.warning("Replication to %s failed for seq=%d..%d: %s", sec, first_seq, last_seq, e)
+
+            # Retry right away if the heartbeat sees the secondary recover meanwhile
+            if recovered.wait(backoff):
+                backoff = RETRY_BACKOFF_MIN
             else:
-                time.sleep(0.2)
-        except Exception as e:
-            logger.warning("Replication to %s failed for seq=%d: %s", sec, seq, e)
-            time.sleep(0.2)
+                backoff = min(backoff * 2, RETRY_BACKOFF_MAX)
+
+        DELIVERED_SEQ[sec] = max(DELIVERED_SEQ[sec], last_seq)
+        status_info["last_ack"] = time.monotonic()
+
+        bit = 1 << SEC_INDEX[sec]
+        with ACK_LOCK:
+            for seq, _ in batch:
+                tracker = ACK_TRACKERS.get(seq)
+                if tracker and not tracker.mask & bit:
+                    tracker.mask |= bit
+                    if tracker.ack_count() >= tracker.required_acks:
+                        tracker.event.set()
+        for _ in batch:
+            q.task_done()
 
 
 def start_replication_workers():
@@ -200,43 +342,161 @@ def start_replication_workers():
 start_replication_workers()
 
 
+# Optional disk spill: keep only the newest HOT_WINDOW messages in MESSAGES and
+# move older ones to an append-only file. 0 keeps the whole log in memory.
+HOT_WINDOW = int(os.environ.get("HOT_WINDOW", "0"))
+SPILL_PATH = os.environ.get("SPILL_PATH", "")
+SPILL_INTERVAL = float(os.environ.get("SPILL_INTERVAL", "1.0"))
+
+
+class LogSpill:
+    """Append-only file of (seq, msg) records evicted from the in-memory window"""
+
+    HEADER = struct.Struct("<QI")  # seq, length of the UTF-8 message
+
+    def __init__(self, path: str = ""):
+        if path:
+            # The log is process-scoped like MESSAGES, so start from an empty file
+            open(path, "wb").close()
+        else:
+            # A private file per process, so two masters on one host never truncate or interleave each other's spill
+            fd, path = tempfile.mkstemp(prefix="replicated-log-", suffix=".bin")
+            os.close(fd)
+            atexit.register(os.remove, path)
+        self.path = path
+
+    def append(self, entries: List[Tuple[int, str]]):
+        with open(self.path, "ab") as f:
+            for seq, msg in entries:
+                data = msg.encode()
+                f.write(self.HEADER.pack(seq, len(data)) + data)
+
+    def read(self, since: int, before: int) -> Iterator[Tuple[int, str]]:
+        """Yield spilled entries with since < seq < before, in seq order"""
+        with open(self.path, "rb") as f:
+            while True:
+                header = f.read(self.HEADER.size)
+                if len(header) < self.HEADER.size:
+                    return
+                seq, size = self.HEADER.unpack(header)
+                if seq >= before:
+                    return
+                data = f.read(size)
+                if seq > since:
+                    yield seq, data.decode()
+
+
+SPILL: Optional[LogSpill] = LogSpill(SPILL_PATH) if HOT_WINDOW > 0 else None
+
+
+def spill_excess():
+    """Move messages beyond the newest HOT_WINDOW from MESSAGES to SPILL"""
+    excess = len(MESSAGES) - HOT_WINDOW
+    if excess > 0:
+        # Written (and closed) before eviction, so readers always find an entry in one place or the other
+        SPILL.append(MESSAGES[:excess])
+        del MESSAGES[:excess]
+        logger.debug("Spilled %d messages to %s", excess, SPILL.path)
+
+
+def spill_worker():
+    """Call spill_excess every SPILL_INTERVAL seconds"""
+    while True:
+        time.sleep(SPILL_INTERVAL)
+        spill_excess()
+
+
+if SPILL:
+    threading.Thread(target=spill_worker, daemon=True).start()
+
+
+def log_entries(since: int = 0) -> Iterable[Tuple[int, str]]:
+    """Entries with seq > since: spilled ones first, then the in-memory window"""
+    mem = MESSAGES[:]
+    if not mem:
+        return ()
+    # Master seqs are contiguous, so the window is indexed by seq - head
+    head = mem[0][0]
+    window = mem[max(0, since + 1 - head):]
+    if SPILL and since + 1 < head:
+        return itertools.chain(SPILL.read(since, head), window)
+    return window
+
+
+def log_length() -> int:
+    """Total messages in the log, including spilled ones (seqs run 1..N)"""
+    tail = MESSAGES[-1:]
+    return tail[0][0] if tail else 0
+
+
+# The log is append-only, so its last seq versions the GET /messages body;
+# the boot id keeps ETags from a previous master process from matching
+_BOOT_ID = os.urandom(4).hex()
+_MSG_CACHE: Tuple[int, bytes] = (0, orjson.dumps({"messages": []}))
+
+
+STREAM_CHUNK = 1000  # messages encoded per chunk of a streamed response
+
+
+def stream_messages(entries: Iterable[Tuple[int, str]]) -> Iterator[bytes]:
+    """Encode {"messages": [...]} incrementally instead of building the list and body in memory"""
+    yield b'{"messages":['
+    sep = b""
+    chunk = []
+    for _, msg in entries:
+        chunk.append(orjson.dumps(msg))
+        if len(chunk) >= STREAM_CHUNK:
+            yield sep + b",".join(chunk)
+            sep, chunk = b",", []
+    if chunk:
+        yield sep + b",".join(chunk)
+    yield b"]}"
+
+
 @app.get("/messages")
 def list_messages():
-    msg_list = [msg for _, msg in sorted(MESSAGES, key=lambda x: x[0])]
-    return jsonify({"messages": msg_list})
+    since = request.args.get("since", 0, type=int)
+    if since > 0:
+        return app.response_class(stream_messages(log_entries(since)), mimetype="application/json")
+
+    # Read before the snapshot, so the ETag never claims more than the body holds
+    version = log_length()
+    if SPILL:
+        # A spilled log is not meant to fit in memory, so stream it rather than cache it
+        resp = app.response_class(stream_messages(log_entries()), mimetype="application/json")
+    else:
+        global _MSG_CACHE
+        cached_version, body = _MSG_CACHE
+        if cached_version != version:
+            body = orjson.dumps({"messages": [msg for _, msg in log_entries()]})
+            _MSG_CACHE = (version, body)
+        resp = app.response_class(body, mimetype="application/json")
+
+    resp.set_etag(f"{_BOOT_ID}-{version}")
+    return resp.make_conditional(request)
 
 def has_quorum() -> bool:
     """Check if master has quorum (majority of nodes healthy)"""
-    if not SECONDARIES:
-        return True
-    
-    init_secondary_statuses()
-    with STATUS_LOCK:
-        healthy_count = sum(
-            1 for sec in SECONDARIES
-            if SECONDARY_STATUS.get(sec, {}).get("status", SecondaryStatus.HEALTHY) == SecondaryStatus.HEALTHY
-        )
-    
-    majority = (len(SECONDARIES) + 1) // 2 + 1
-    quorum = 1 + healthy_count
-    return quorum >= majority
+    # Recomputed by the heartbeat path on every status update, so the write
+    # path reads a single global instead of walking the status records
+    return HAS_QUORUM
 
 
 @app.post("/messages")
 def append_message():
-    data = request.get_json(silent=True) or {}
+    data = _request_json()
     msg = data.get("msg")
     if not isinstance(msg, str):
-        return jsonify({"error": "Expected JSON with string field 'msg'"}), 400
+        return _json_response({"error": "Expected JSON with string field 'msg'"}, 400)
 
     # Quorum check
     if not has_quorum():
-        return jsonify({
+        return _json_response({
             "error": "no quorum, master is read-only",
             "detail": "Not enough healthy nodes to form a majority"
-        }), 503
+        }, 503)
 
-    start_ts = time.time()
+    start_ns = time.monotonic_ns()
 
     # Validate and normalize w
     w = data.get("w")
@@ -245,92 +505,76 @@ def append_message():
     else:
         w = int(w)
         if not (1 <= w <= len(SECONDARIES) + 1):
-            return jsonify({"error": f"Write concern w must be between 1 and {len(SECONDARIES) + 1}"}), 400
-
-    # Assign seq
-    global SEQ_COUNTER
-    with SEQ_LOCK:
-        SEQ_COUNTER += 1
-        seq = SEQ_COUNTER
-
-    MESSAGES.append((seq, msg))
-    logger.info("Appended locally seq=%d msg=%s w=%d", seq, msg, w)
-
-    # Enqueue message for all secondaries
-    with REPLICATION_LOCK:
-        for sec in SECONDARIES:
-            REPLICATION_QUEUES.setdefault(sec, []).append((seq, msg))
+            return _json_response({"error": f"Write concern w must be between 1 and {len(SECONDARIES) + 1}"}, 400)
 
     required_acks = w - 1
     tracker = None
-
     if required_acks > 0 and SECONDARIES:
         tracker = AckTracker(required_acks=required_acks)
-        with ACK_LOCK:
-            ACK_TRACKERS[seq] = tracker
 
+    # Assign seq and append under the same lock so MESSAGES stays in seq order
+    with SEQ_LOCK:
+        seq = SEQ_NEXT()
+        MESSAGES.append((seq, msg))
+
+        # Register the tracker before enqueueing so an early ACK is never missed
+        if tracker:
+            with ACK_LOCK:
+                ACK_TRACKERS[seq] = tracker
+
+        # Enqueue message for all secondaries (in seq order)
+        for sec in SECONDARIES:
+            REPLICATION_QUEUES[sec].put((seq, msg))
+    logger.debug("Appended locally seq=%d msg=%s w=%d", seq, msg, w)
+
+    if tracker:
         # Wait until enough different secondaries have acked (with timeout to prevent indefinite hangs)
         # Timeout: 30 seconds per required ACK, minimum 60 seconds
         timeout_seconds = max(60, required_acks * 30)
         wait_result = tracker.event.wait(timeout=timeout_seconds)
 
         # Verify condition after wake-up
-        if not wait_result or len(tracker.acked_by) < required_acks:
+        if not wait_result or tracker.ack_count() < required_acks:
             with ACK_LOCK:
                 ACK_TRACKERS.pop(seq, None)
-            return jsonify({
+            return _json_response({
                 "error": f"Write concern w={w} not satisfied",
-                "detail": f"Required {required_acks} ACKs, got {len(tracker.acked_by)} (timeout: {timeout_seconds}s)",
-                "acked_by": list(tracker.acked_by)
-            }), 502
+                "detail": f"Required {required_acks} ACKs, got {tracker.ack_count()} (timeout: {timeout_seconds}s)",
+                "acked_by": tracker.acked_by()
+            }, 502)
 
-    duration_ms = int((time.time() - start_ts) * 1000)
+    duration_ms = (time.monotonic_ns() - start_ns) // 1_000_000
 
     # Prepare response
-    msg_list = [m for _, m in sorted(MESSAGES, key=lambda x: x[0])]
     acks = []
     if tracker:
-        acks = [{"secondary": s} for s in tracker.acked_by]
+        acks = [{"secondary": s} for s in tracker.acked_by()]
         with ACK_LOCK:
             ACK_TRACKERS.pop(seq, None)
 
     if required_acks > 0:
-        logger.info("Write concern w=%d satisfied with %d ACKs in %d ms", w, len(acks), duration_ms)
-    logger.info("POST /messages completed w=%d, acks=%d in %d ms", w, len(acks), duration_ms)
-    return jsonify({
-        "messages": msg_list,
+        logger.debug("Write concern w=%d satisfied with %d ACKs in %d ms", w, len(acks), duration_ms)
+    logger.debug("POST /messages completed w=%d, acks=%d in %d ms", w, len(acks), duration_ms)
+    resp = {
+        "seq": seq,
+        "msg": msg,
         "acks": acks,
         "w": w,
         "duration_ms": duration_ms,
-    }), 201
+    }
+    # The full log is O(N) to copy and encode, so only send it when asked for
+    if request.args.get("include_messages") == "1":
+        resp["messages"] = [m for _, m in log_entries()]
+    return _json_response(resp, 201)
 
 
 @app.get("/health")
 def health():
-    init_secondary_statuses()
-    
-    with STATUS_LOCK:
-        secondary_statuses = {}
-        for sec_url in SECONDARIES:
-            if sec_url in SECONDARY_STATUS:
-                status_info = SECONDARY_STATUS[sec_url]
-                secondary_statuses[sec_url] = {
-                    "status": status_info["status"].value,
-                    "last_heartbeat": status_info["last_heartbeat"],
-                    "failures": status_info["failures"],
-                    "last_success": status_info["last_success"]
-                }
-            else:
-                secondary_statuses[sec_url] = {
-                    "status": SecondaryStatus.HEALTHY.value,
-                    "last_heartbeat": 0,
-                    "failures": 0,
-                    "last_success": 0
-                }
-    
-    return jsonify({
+    secondary_statuses = {sec_url: SECONDARY_STATUS[sec_url]["view"] for sec_url in SECONDARIES}
+
+    return _json_response({
         "status": "ok",
-        "count": len(MESSAGES),
+        "count": log_length(),
         "secondaries": SECONDARIES,
         "secondary_statuses": secondary_statuses
     })
@@ -1,10 +1,14 @@
 import os
+import gzip
+import zlib
+import bisect
 import time
 import logging
 import threading
 import random
-from typing import List, Tuple
-from flask import Flask, request, jsonify
+from typing import List, Optional, Set, Tuple
+from flask import Flask, request
+import orjson
 
 app = Flask(__name__)
 
@@ -18,68 +22,126 @@ DELAY_MS = int(os.environ.get("DELAY_MS", "0"))
 
 # Messages with sequence numbers for ordering and deduplication
 MESSAGES: List[Tuple[int, str]] = []
+SEQS: List[int] = []  # sorted seq keys, parallel to MESSAGES
+SEEN_SEQS: Set[int] = set()
+CONTIG_LEN = 0  # length of the gap-free run at the head of MESSAGES, i.e. what readers see
 MESSAGES_LOCK = threading.Lock()
+# Serialized GET /messages body; reset to None whenever a message is inserted
+_MSG_CACHE: Optional[bytes] = None
+
+
+def _json_response(obj, status: int = 200):
+    return app.response_class(orjson.dumps(obj), status=status, mimetype="application/json")
+
+
+def _request_json() -> dict:
+    """Parse the JSON request body, accepting gzip Content-Encoding from the master"""
+    raw = request.get_data()
+    try:
+        if request.headers.get("Content-Encoding") == "gzip":
+            raw = gzip.decompress(raw)
+        data = orjson.loads(raw)
+    except (OSError, EOFError, ValueError, zlib.error):
+        return {}
+    return data if isinstance(data, dict) else {}
 
 
 @app.get("/messages")
 def list_messages():
+    global _MSG_CACHE
     with MESSAGES_LOCK:
-        ordered = sorted(MESSAGES, key=lambda x: x[0])
-        visible = []
-        if ordered:
-            expected = ordered[0][0]
-            for seq, msg in ordered:
-                if seq == expected:
-                    visible.append(msg)
-                    expected += 1
-                elif seq > expected:
-                    logger.info("Gap detected: hiding seq=%d until seq=%d arrives", seq, expected)
-                    break
-                else:
-                    continue
-    return jsonify({"messages": visible})
+        body = _MSG_CACHE
+        if body is None:
+            if CONTIG_LEN < len(SEQS):
+                logger.info("Gap detected: hiding seq=%d until seq=%d arrives",
+                            SEQS[CONTIG_LEN], SEQS[CONTIG_LEN - 1] + 1)
+            body = _MSG_CACHE = orjson.dumps({"messages": [msg for _, msg in MESSAGES[:CONTIG_LEN]]})
+    return app.response_class(body, mimetype="application/json")
+
+def _extend_contiguous(insert_pos: int, seq: int):
+    """Update CONTIG_LEN after inserting seq at insert_pos. Caller holds MESSAGES_LOCK."""
+    global CONTIG_LEN
+    if insert_pos == 0:
+        # New head: the visible run restarts from it
+        CONTIG_LEN = 1
+    elif insert_pos == CONTIG_LEN and SEQS[insert_pos - 1] + 1 == seq:
+        CONTIG_LEN += 1
+    else:
+        return
+    while CONTIG_LEN < len(SEQS) and SEQS[CONTIG_LEN] == SEQS[CONTIG_LEN - 1] + 1:
+        CONTIG_LEN += 1
+
+
+def _insert_message(seq: int, msg: str) -> bool:
+    """Insert in seq order; returns False for a duplicate seq. Caller holds MESSAGES_LOCK."""
+    global _MSG_CACHE
+    # Check for duplicate sequence number (retry handling)
+    if seq in SEEN_SEQS:
+        logger.info("Duplicate seq %d detected, skipping replication", seq)
+        return False
+
+    # Insert in sequence order to maintain total ordering
+    insert_pos = bisect.bisect_left(SEQS, seq)
+    SEQS.insert(insert_pos, seq)
+    SEEN_SEQS.add(seq)
+    MESSAGES.insert(insert_pos, (seq, msg))
+    _extend_contiguous(insert_pos, seq)
+    _MSG_CACHE = None
+    logger.info("Replicated seq=%d msg=%s (pos=%d)", seq, msg, insert_pos)
+    return True
+
 
 @app.post("/replicate")
 def replicate():
-    data = request.get_json(silent=True) or {}
+    data = _request_json()
+
+    # Batched form: {"batch": [{"seq": ..., "msg": ...}, ...]}
+    batch = data.get("batch")
+    if batch is not None:
+        if not isinstance(batch, list) or not all(
+            isinstance(item, dict) and isinstance(item.get("msg"), str) for item in batch
+        ):
+            return _json_response({"error": "Expected JSON with list field 'batch' of {seq, msg}"}, 400)
+
+        if DELAY_MS > 0:
+            logger.debug("Simulating delay %d ms", DELAY_MS)
+            time.sleep(DELAY_MS / 1000.0)
+
+        seqs = [item.get("seq", 0) for item in batch]
+        with MESSAGES_LOCK:
+            duplicates = [seq for seq, item in zip(seqs, batch) if not _insert_message(seq, item["msg"])]
+
+        # Randomly simulate internal error after storing (for retry & dedup tests)
+        if random.random() < 0.2:
+            return _json_response({"error": "simulated internal error", "seqs": seqs}, 500)
+
+        return _json_response({"status": "ok", "seqs": seqs, "duplicates": duplicates})
+
     msg = data.get("msg")
     if not isinstance(msg, str):
-        return jsonify({"error": "Expected JSON with string field 'msg'"}), 400
+        return _json_response({"error": "Expected JSON with string field 'msg'"}, 400)
 
     seq = data.get("seq", 0)
 
     if DELAY_MS > 0:
-        logger.info("Simulating delay %d ms", DELAY_MS)
+        logger.debug("Simulating delay %d ms", DELAY_MS)
         time.sleep(DELAY_MS / 1000.0)
 
     # Atomic check-and-insert to prevent race conditions
     with MESSAGES_LOCK:
-        # Check for duplicate sequence number (retry handling)
-        if any(seq_num == seq for seq_num, _ in MESSAGES):
-            logger.info("Duplicate seq %d detected, skipping replication", seq)
-            return jsonify({"status": "ok", "idx": -1, "duplicate": True})
-
-        # Insert in sequence order to maintain total ordering
-        insert_pos = 0
-        for i, (seq_num, _) in enumerate(MESSAGES):
-            if seq_num < seq:
-                insert_pos = i + 1
-            else:
-                break
-
-        MESSAGES.insert(insert_pos, (seq, msg))
-        logger.info("Replicated seq=%d msg=%s (pos=%d)", seq, msg, insert_pos)
+        if not _insert_message(seq, msg):
+            return _json_response({"status": "ok", "idx": -1, "duplicate": True})
 
     # Randomly simulate internal error after storing (for retry & dedup tests)
     if random.random() < 0.2:
-        return jsonify({"error": "simulated internal error", "seq": seq}), 500
+        return _json_response({"error": "simulated internal error", "seq": seq}, 500)
 
-    return jsonify({"status": "ok", "seq": seq})
+    return _json_response({"status": "ok", "seq": seq})
 
 
 @app.get("/health")
 def health():
-    return jsonify({"status": "ok", "count": len(MESSAGES), "delay_ms": DELAY_MS})
+    return _json_response({"status": "ok", "count": len(MESSAGES), "delay_ms": DELAY_MS})
 
 
 if __name__ == "__main__":
@@ -97,7 +97,7 @@ echo "Step 4: Master POST /messages - First message"
 RESPONSE1=$(curl -s -X POST "http://$host:8000/messages" \
   -H 'Content-Type: application/json' \
   -d '{"msg":"test message 1"}')
-echo "$RESPONSE1" | jq '{messages, acks_count: (.acks | length), duration_ms}'
+echo "$RESPONSE1" | jq '{seq, msg, acks_count: (.acks | length), duration_ms}'
 echo ""
 
 # Step 5: Test Secondary GET Method (verify replication)
@@ -135,7 +135,7 @@ for i in {2..4}; do
   echo "Posting message $i..."
   curl -s -X POST "http://$host:8000/messages" \
     -H 'Content-Type: application/json' \
-    -d "{\"msg\":\"message $i\"}" | jq '{message: .messages[-1], duration_ms, acks_count: (.acks | length)}'
+    -d "{\"msg\":\"message $i\"}" | jq '{message: .msg, duration_ms, acks_count: (.acks | length)}'
   sleep 0.3
 done
 echo ""
@@ -6,44 +6,16 @@ Tests: retry, blocking w=3, parallel clients, catch-up
 import os
 import time
 import threading
-import subprocess
 import requests
 
+from tests._cluster import SESSION, start_secondary2, stop_secondary2, wait_until
+
 BASE = "http://localhost"
 MASTER = f"{BASE}:8000"
 S1 = f"{BASE}:8001"
 S2 = f"{BASE}:8002"
 
 
-def stop_secondary2():
-    """Stop secondary2 container"""
-    subprocess.run(
-        ["docker", "compose", "stop", "secondary2"],
-        capture_output=True,
-        text=True,
-    )
-
-
-def start_secondary2():
-    """Start secondary2 container and wait for it to be healthy"""
-    subprocess.run(
-        ["docker", "compose", "start", "secondary2"],
-        capture_output=True,
-        text=True,
-    )
-    # Wait for health check
-    deadline = time.time() + 30
-    while time.time() < deadline:
-        try:
-            resp = requests.get(f"{S2}/health", timeout=2)
-            if resp.status_code == 200:
-                return
-        except requests.RequestException:
-            pass
-        time.sleep(1)
-    raise TimeoutError("Secondary2 did not become healthy in time")
-
-
 def main():
     print("=" * 50)
     print("Self-Check Acceptance Test for Iteration 3")
@@ -52,16 +24,15 @@ def main():
     
     # Ensure secondary2 is stopped
     print("Stopping S2...")
-    stop_secondary2()
-    time.sleep(2)
+    assert stop_secondary2(), "S2 did not stop"
     print("✅ S2 stopped")
     print()
     
     # Step 1: POST Msg1 with w=1
     print("Step 1: POST Msg1 with w=1 (should return quickly)")
-    start = time.time()
-    r1 = requests.post(f"{MASTER}/messages", json={"msg": "Msg1", "w": 1}, timeout=10)
-    elapsed = (time.time() - start) * 1000
+    start = time.monotonic()
+    r1 = SESSION.post(f"{MASTER}/messages", json={"msg": "Msg1", "w": 1}, timeout=10)
+    elapsed = (time.monotonic() - start) * 1000
     body1 = r1.json()
     print(f"  Response: w={body1.get('w')}, duration={elapsed:.0f}ms")
     assert body1["w"] == 1, f"Expected w=1, got {body1.get('w')}"
@@ -71,9 +42,9 @@ def main():
     
     # Step 2: POST Msg2 with w=2
     print("Step 2: POST Msg2 with w=2 (should wait for S1)")
-    start = time.time()
-    r2 = requests.post(f"{MASTER}/messages", json={"msg": "Msg2", "w": 2}, timeout=10)
-    elapsed = (time.time() - start) * 1000
+    start = time.monotonic()
+    r2 = SESSION.post(f"{MASTER}/messages", json={"msg": "Msg2", "w": 2}, timeout=10)
+    elapsed = (time.monotonic() - start) * 1000
     body2 = r2.json()
     print(f"  Response: w={body2.get('w')}, acks={len(body2.get('acks', []))}, duration={elapsed:.0f}ms")
     assert body2["w"] == 2, f"Expected w=2, got {body2.get('w')}"
@@ -87,26 +58,28 @@ def main():
     
     def post_msg3():
         try:
-            msg3_result["response"] = requests.post(
+            msg3_result["response"] = SESSION.post(
                 f"{MASTER}/messages", json={"msg": "Msg3", "w": 3}, timeout=60
             )
         except Exception as e:
             msg3_result["error"] = e
     
+    logged_before = SESSION.get(f"{MASTER}/health", timeout=5).json()["count"]
     t_msg3 = threading.Thread(target=post_msg3)
     t_msg3.start()
     
-    # Give msg3 time to reach the "waiting for S2" state
-    time.sleep(1)
+    # Msg3 is in the "waiting for S2" state once master has appended it
+    assert wait_until(lambda: SESSION.get(f"{MASTER}/health", timeout=5).json()["count"] > logged_before,
+                      timeout=2), "w=3 write was never appended by master"
     assert t_msg3.is_alive(), "Msg3 (w=3) should be blocked while S2 is down"
     print("  ✅ Msg3 is blocking (as expected)")
     print()
     
     # Step 4: POST Msg4 with w=1 (should not be blocked)
     print("Step 4: POST Msg4 with w=1 (should return immediately, not blocked by Msg3)")
-    start_w1 = time.time()
-    r4 = requests.post(f"{MASTER}/messages", json={"msg": "Msg4", "w": 1}, timeout=10)
-    elapsed_w1 = (time.time() - start_w1) * 1000
+    start_w1 = time.monotonic()
+    r4 = SESSION.post(f"{MASTER}/messages", json={"msg": "Msg4", "w": 1}, timeout=10)
+    elapsed_w1 = (time.monotonic() - start_w1) * 1000
     body4 = r4.json()
     print(f"  Response: w={body4.get('w')}, duration={elapsed_w1:.0f}ms")
     assert body4["w"] == 1, f"Expected w=1, got {body4.get('w')}"
@@ -119,7 +92,7 @@ def main():
     
     # Step 5: Start S2
     print("Step 5: Starting S2...")
-    start_secondary2()
+    assert start_secondary2(), "Secondary2 did not become healthy in time"
     print("  ✅ S2 started and healthy")
     print()
     
@@ -138,24 +111,28 @@ def main():
     # Step 6: Check messages on S2
     print("Step 6: Check messages on S2")
     print("Waiting for catch-up replication...")
-    time.sleep(5)
-    
-    deadline = time.time() + 30
-    final_msgs = []
-    while time.time() < deadline:
+    expected = ["Msg1", "Msg2", "Msg3", "Msg4"]
+    wanted = frozenset(expected)
+    test_msgs = []
+    seen_count = -1
+
+    def s2_converged():
+        nonlocal test_msgs, seen_count
         try:
-            final_msgs = requests.get(f"{S2}/messages", timeout=5).json()["messages"]
-            test_msgs = [m for m in final_msgs if m in ["Msg1", "Msg2", "Msg3", "Msg4"]]
-            if test_msgs == ["Msg1", "Msg2", "Msg3", "Msg4"]:
-                break
+            # /health count only moves when S2 stores a message, so skip re-reading the full log until it does
+            count = SESSION.get(f"{S2}/health", timeout=5).json()["count"]
+            if count == seen_count:
+                return False
+            seen_count = count
+            test_msgs = [m for m in SESSION.get(f"{S2}/messages", timeout=5).json()["messages"] if m in wanted]
         except requests.RequestException:
-            pass
-        time.sleep(1)
-    
-    test_msgs = [m for m in final_msgs if m in ["Msg1", "Msg2", "Msg3", "Msg4"]]
+            return False
+        return test_msgs == expected
+
+    wait_until(s2_converged, timeout=30)
     print(f"  S2 messages (test): {test_msgs}")
-    assert test_msgs == ["Msg1", "Msg2", "Msg3", "Msg4"], \
-        f"S2 messages mismatch: expected ['Msg1', 'Msg2', 'Msg3', 'Msg4'], got {test_msgs}"
+    assert test_msgs == expected, \
+        f"S2 messages mismatch: expected {expected}, got {test_msgs}"
     print("  ✅ Step 6 PASS: S2 has all messages in correct order")
     print()
     
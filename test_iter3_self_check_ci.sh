@@ -32,7 +32,10 @@ echo ""
 # Ensure S2 is stopped
 echo "Ensuring S2 is stopped..."
 docker compose stop secondary2 2>/dev/null || true
-sleep 2
+for i in {1..50}; do
+    [ -z "$(docker compose ps --status running --quiet secondary2 2>/dev/null)" ] && break
+    sleep 0.1
+done
 
 # Verify M and S1 are healthy
 echo "Verifying M and S1 are healthy..."
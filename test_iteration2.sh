@@ -180,7 +180,9 @@ fi
 
 echo "Checking logs for async replication..."
 if command -v docker >/dev/null 2>&1; then
-  $DOCKER_COMPOSE_CMD logs master 2>/dev/null | grep -E "(w1_test|w=1|asynchronously)" | tail -3 || echo "  (logs not available)"
+  # Per-write lines are logged at DEBUG; with the default LOG_LEVEL=INFO the grep finds nothing
+  master_logs=$($DOCKER_COMPOSE_CMD logs master 2>/dev/null | grep -E "(w1_test|w=1|asynchronously)" | tail -3) || true
+  echo "${master_logs:-  (no per-write log lines; set LOG_LEVEL=DEBUG for master to see them)}"
 fi
 
 echo "Checking immediate inconsistency..."
@@ -265,7 +267,8 @@ else
   
   echo "Checking logs for timing details..."
   if command -v docker >/dev/null 2>&1; then
-    $DOCKER_COMPOSE_CMD logs master 2>/dev/null | grep -E "(w2_test|satisfied)" | tail -3 || echo "  (logs not available)"
+    master_logs=$($DOCKER_COMPOSE_CMD logs master 2>/dev/null | grep -E "(w2_test|satisfied)" | tail -3) || true
+    echo "${master_logs:-  (no per-write log lines; set LOG_LEVEL=DEBUG for master to see them)}"
   fi
 fi
 echo ""
@@ -525,7 +528,8 @@ if [ "$NUM_SECONDARIES" -ge 1 ]; then
   
   if command -v docker >/dev/null 2>&1; then
     echo "Checking logs for timing details..."
-    $DOCKER_COMPOSE_CMD logs master 2>/dev/null | grep -E "(w2_timing_verify|satisfied)" | tail -3 || echo "  (logs not available)"
+    master_logs=$($DOCKER_COMPOSE_CMD logs master 2>/dev/null | grep -E "(w2_timing_verify|satisfied)" | tail -3) || true
+    echo "${master_logs:-  (no per-write log lines; set LOG_LEVEL=DEBUG for master to see them)}"
   fi
   
   if [ "$acks_count" -ge 1 ]; then
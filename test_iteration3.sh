@@ -301,7 +301,7 @@ sleep 3
 
 echo "Attempting POST with quorum restored..."
 quorum_resp2=$(post_message "quorum_test_after" 1)
-if echo "$quorum_resp2" | jq -e '.messages' >/dev/null 2>&1; then
+if echo "$quorum_resp2" | jq -e '.seq' >/dev/null 2>&1; then
     echo "✅ Quorum restored: POST accepted"
 else
     echo "⚠️  POST still rejected after quorum restored"
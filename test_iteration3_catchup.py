@@ -1,23 +1,28 @@
 #!/usr/bin/env python3
 """Test catch-up after downtime: all missed messages delivered"""
-import requests
-import time
+import concurrent.futures
+import re
 import sys
 
+from tests._cluster import SESSION, healthy, wait_until
+
 MASTER = "http://localhost:8000"
 SECONDARY2 = "http://localhost:8002"
 
+# Matches this test's own messages (M1..M10), reused for every node
+_M_RE = re.compile(r"M\d+")
+
 def post_message(msg, w=None):
     """POST message to master"""
     data = {"msg": msg}
     if w is not None:
         data["w"] = w
-    resp = requests.post(f"{MASTER}/messages", json=data, timeout=60)
+    resp = SESSION.post(f"{MASTER}/messages", json=data, timeout=60)
     return resp.json()
 
 def get_messages(url):
     """GET messages from URL"""
-    resp = requests.get(f"{url}/messages", timeout=10)
+    resp = SESSION.get(f"{url}/messages", timeout=10)
     return resp.json().get("messages", [])
 
 def test_catchup():
@@ -32,27 +37,25 @@ def test_catchup():
     print()
     
     # Send multiple messages with various w values
-    messages = []
+    messages = [f"M{i}" for i in range(1, 11)]
+    ws = [1 if i % 3 == 0 else (2 if i % 3 == 1 else None) for i in range(1, 11)]
     print("Sending messages M1..M10 with various w values...")
     
-    for i in range(1, 11):
-        w = 1 if i % 3 == 0 else (2 if i % 3 == 1 else None)
-        msg = f"M{i}"
-        messages.append(msg)
-        
+    # The sends are independent, so put them all in flight at once
+    with concurrent.futures.ThreadPoolExecutor(max_workers=len(messages)) as executor:
+        responses = list(executor.map(post_message, messages, ws))
+    
+    for msg, w, resp in zip(messages, ws, responses):
         if w:
             print(f"  POST {msg} with w={w}")
         else:
             print(f"  POST {msg} (default w)")
         
-        resp = post_message(msg, w)
         if "error" in resp:
             print(f"    ❌ Error: {resp['error']}")
         else:
             acks = len(resp.get("acks", []))
             print(f"    ✅ w={resp.get('w')}, acks={acks}")
-        
-        time.sleep(0.1)
     
     print()
     print("Starting secondary2...")
@@ -61,20 +64,13 @@ def test_catchup():
     
     # Wait for S2 to be healthy
     print("Waiting for S2 to be healthy...")
-    for i in range(30):
-        try:
-            resp = requests.get(f"{SECONDARY2}/health", timeout=2)
-            if resp.status_code == 200:
-                print("✅ S2 is healthy")
-                break
-        except:
-            pass
-        time.sleep(1)
+    if wait_until(lambda: healthy(SECONDARY2), timeout=30):
+        print("✅ S2 is healthy")
     
     # Wait for catch-up
     print()
     print("Waiting for catch-up replication...")
-    time.sleep(5)
+    wait_until(lambda: set(messages) <= set(get_messages(SECONDARY2)), timeout=5)
     
     # Check messages on S2
     print()
@@ -87,8 +83,8 @@ def test_catchup():
     print(f"Master has {len(master_messages)} messages")
     
     # Filter to our test messages
-    s2_test = [m for m in s2_messages if m.startswith("M") and m[1:].isdigit()]
-    master_test = [m for m in master_messages if m.startswith("M") and m[1:].isdigit()]
+    s2_test = [m for m in s2_messages if _M_RE.fullmatch(m)]
+    master_test = [m for m in master_messages if _M_RE.fullmatch(m)]
     
     print()
     print(f"Master test messages: {master_test}")
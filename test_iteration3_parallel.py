@@ -1,10 +1,11 @@
 #!/usr/bin/env python3
 """Test parallel clients: w=3 blocked, w=1 not blocked"""
-import requests
-import threading
+import concurrent.futures
 import time
 import sys
 
+from tests._cluster import SESSION, healthy, wait_until
+
 MASTER = "http://localhost:8000"
 
 def post_with_timing(msg, w=None):
@@ -13,13 +14,13 @@ def post_with_timing(msg, w=None):
     if w is not None:
         data["w"] = w
     
-    start = time.time()
+    start = time.monotonic_ns()
     try:
-        resp = requests.post(f"{MASTER}/messages", json=data, timeout=60)
-        duration_ms = int((time.time() - start) * 1000)
+        resp = SESSION.post(f"{MASTER}/messages", json=data, timeout=60)
+        duration_ms = (time.monotonic_ns() - start) // 1_000_000
         return resp.json(), duration_ms
     except Exception as e:
-        duration_ms = int((time.time() - start) * 1000)
+        duration_ms = (time.monotonic_ns() - start) // 1_000_000
         return {"error": str(e)}, duration_ms
 
 def test_parallel_clients():
@@ -35,23 +36,15 @@ def test_parallel_clients():
     print()
     
     # Start w=3 request in background
-    result_w3 = {"done": False, "response": None, "duration": 0}
-    
-    def send_w3():
-        resp, dur = post_with_timing("Msg3_parallel", w=3)
-        result_w3["response"] = resp
-        result_w3["duration"] = dur
-        result_w3["done"] = True
-    
-    thread_w3 = threading.Thread(target=send_w3, daemon=False)
+    executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
     print("Step 1: Starting Msg3 with w=3 in background thread...")
-    thread_w3.start()
+    fut_w3 = executor.submit(post_with_timing, "Msg3_parallel", w=3)
     
     # Wait a bit for it to enter blocked state
     time.sleep(0.5)
     
-    # Check if thread is still alive (blocked)
-    if thread_w3.is_alive():
+    # Check if request is still in flight (blocked)
+    if not fut_w3.done():
         print("✅ Msg3 (w=3) is blocking (as expected)")
     else:
         print("⚠️  Msg3 (w=3) already completed (unexpected if S2 is down)")
@@ -69,7 +62,7 @@ def test_parallel_clients():
         print(f"⚠️  w=1 took {dur_w1}ms (might be blocked?)")
     
     # Check if w=3 is still blocking
-    if thread_w3.is_alive():
+    if not fut_w3.done():
         print("✅ w=3 is still blocking (proves no global blocking)")
     else:
         print("⚠️  w=3 already completed")
@@ -82,31 +75,23 @@ def test_parallel_clients():
     
     # Wait for S2 to be healthy
     print("Waiting for S2 to be healthy...")
-    for i in range(30):
-        try:
-            resp = requests.get("http://localhost:8002/health", timeout=2)
-            if resp.status_code == 200:
-                print("✅ S2 is healthy")
-                break
-        except:
-            pass
-        time.sleep(1)
+    if wait_until(lambda: healthy("http://localhost:8002"), timeout=30):
+        print("✅ S2 is healthy")
     
     # Wait for w=3 to complete
     print("Waiting for w=3 request to complete...")
-    thread_w3.join(timeout=30)
-    
-    if result_w3["done"]:
-        resp = result_w3["response"]
-        dur = result_w3["duration"]
+    try:
+        resp, dur = fut_w3.result(timeout=30)
+    except concurrent.futures.TimeoutError:
+        print("❌ w=3 did not complete within timeout")
+    else:
         acks_count = len(resp.get("acks", []))
         print(f"✅ w=3 completed: {acks_count} ACKs, duration={dur}ms")
         if acks_count >= 2:
             print("✅ w=3 got ACKs from both secondaries")
         else:
             print(f"⚠️  w=3 got {acks_count} ACKs (expected 2)")
-    else:
-        print("❌ w=3 did not complete within timeout")
+    executor.shutdown(wait=False)
     
     print()
     print("=" * 60)
@@ -0,0 +1,156 @@
+"""
+Cluster helpers shared by the pytest suites and the standalone iteration scripts
+"""
+import functools
+import json
+import os
+import random
+import socket
+import subprocess
+import time
+import uuid
+from typing import List
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+import yaml
+
+try:
+    from orjson import dumps as json_dumps, loads as json_loads
+except ImportError:  # orjson is optional for the tests; its errors subclass json.JSONDecodeError
+    from json import loads as json_loads
+
+    def json_dumps(obj) -> bytes:
+        return json.dumps(obj, separators=(",", ":")).encode()
+
+# One keep-alive connection pool shared by every request the tests and scripts make
+POOL_SIZE = 32
+SESSION = requests.Session()
+SESSION.mount("http://", HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE, max_retries=0))
+
+BASE = "http://localhost"
+MASTER_PORT = int(os.environ.get("MASTER_PORT", "8000"))
+MASTER = f"{BASE}:{MASTER_PORT}"
+
+
+def _uniq(tag: str) -> str:
+    # Random suffix, so two tests starting in the same millisecond never share a prefix
+    return f"{tag}_{uuid.uuid4().hex[:10]}"
+
+
+def _host_port(mapping) -> int:
+    # Short syntax is [HOST_IP:]HOST_PORT:CONTAINER_PORT, long syntax is a dict with "published"
+    if isinstance(mapping, dict):
+        return int(mapping.get("published", 0))
+    parts = str(mapping).split(":")
+    return int(parts[-2]) if len(parts) > 1 else 0
+
+
+def _compose_ps_containers(stdout: bytes) -> list:
+    # Older compose v2 releases print one JSON array, newer ones print one object per line
+    stdout = stdout.strip()
+    if stdout.startswith(b"["):
+        return json_loads(stdout)
+    return [json_loads(line) for line in stdout.splitlines() if line.strip()]
+
+
+def get_secondary_ports() -> List[int]:
+    """Discover secondary ports from docker-compose.yml or docker compose ps"""
+    ports: List[int] = []
+    try:
+        with open("docker-compose.yml", "r") as f:
+            compose = yaml.load(f, Loader=getattr(yaml, "CSafeLoader", yaml.SafeLoader))
+
+        for svc_name, cfg in compose.get("services", {}).items():
+            if svc_name.startswith("secondary"):
+                for port_mapping in cfg.get("ports", []):
+                    host_port = _host_port(port_mapping)
+                    if host_port and host_port != MASTER_PORT and host_port not in ports:
+                        ports.append(host_port)
+        ports.sort()
+    except (FileNotFoundError, yaml.YAMLError, KeyError, ValueError):
+        pass
+
+    if not ports:
+        try:
+            cmd = ["docker", "compose", "ps", "--format", "json"]
+            result = subprocess.run(
+                cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, check=True  # nosec B603 - safe command
+            )
+            for c in _compose_ps_containers(result.stdout):
+                if c.get("Service", "").startswith("secondary"):
+                    for pub in c.get("Publishers", []):
+                        host_port = pub.get("PublishedPort")
+                        if host_port and host_port != MASTER_PORT and host_port not in ports:
+                            ports.append(host_port)
+            ports.sort()
+        except (FileNotFoundError, subprocess.CalledProcessError, json.JSONDecodeError, KeyError):
+            pass
+
+    # Fallback for local dev
+    if not ports:
+        return [8001, 8002]
+
+    return ports
+
+
+@functools.lru_cache(maxsize=None)
+def secondaries() -> List[str]:
+    # Resolved on first use rather than at import, so collection alone never parses
+    # docker-compose.yml or shells out to `docker compose ps`
+    return [f"{BASE}:{p}" for p in get_secondary_ports()]
+
+
+# Private generator so jitter never disturbs (or depends on) the global random state
+_JITTER = random.Random(0)
+
+
+def wait_until(predicate, timeout: float = 10.0, base: float = 0.05, cap: float = 0.5) -> bool:
+    """Poll predicate() with capped exponential backoff and +/-25% jitter until true or timeout"""
+    deadline = time.monotonic() + timeout
+    attempt = 0
+    while True:
+        if predicate():
+            return True
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return False
+        time.sleep(min(remaining, min(cap, base * 2 ** attempt) * _JITTER.uniform(0.75, 1.25)))
+        attempt += 1
+
+
+def healthy(url: str) -> bool:
+    """True if url/health answers 200"""
+    try:
+        return SESSION.get(f"{url}/health", timeout=2).status_code == 200
+    except requests.RequestException:
+        return False
+
+
+def listening(url: str) -> bool:
+    # Bare TCP connect: far cheaper than an HTTP round trip while a container is down
+    parts = urlsplit(url)
+    try:
+        socket.create_connection((parts.hostname, parts.port), timeout=0.2).close()
+        return True
+    except OSError:
+        return False
+
+
+def secondary2() -> str:
+    """Base URL of the secondary the failure tests stop and restart"""
+    return secondaries()[1] if len(secondaries()) > 1 else secondaries()[0]
+
+
+def stop_secondary2(timeout: float = 15) -> bool:
+    """Stop the secondary2 container; True once its port no longer accepts connections"""
+    subprocess.run(["docker", "compose", "stop", "secondary2"], capture_output=True)
+    return wait_until(lambda: not listening(secondary2()), timeout=timeout)
+
+
+def start_secondary2(timeout: float = 30) -> bool:
+    """Start the secondary2 container; True once it answers /health"""
+    subprocess.run(["docker", "compose", "start", "secondary2"], capture_output=True)
+    # docker-proxy may accept connections before the app inside does, so /health stays authoritative
+    return wait_until(lambda: listening(secondary2()) and healthy(secondary2()), timeout=timeout)
@@ -0,0 +1,13 @@
+import pytest
+
+from tests._cluster import secondary2, start_secondary2, stop_secondary2
+
+
+@pytest.fixture
+def stopped_secondary2():
+    """Stop secondary2 for one test, then start it again; a test may restart it earlier itself"""
+    assert stop_secondary2(), "secondary2 did not stop"
+    try:
+        yield secondary2()
+    finally:
+        assert start_secondary2(), "secondary2 did not become healthy again"
@@ -1,87 +1,51 @@
-import os
 import time
-import requests
-import yaml
-import subprocess
-import json
-
-BASE = "http://localhost"
-MASTER_PORT = int(os.environ.get("MASTER_PORT", "8000"))
-MASTER = f"{BASE}:{MASTER_PORT}"
-
-
-def get_secondary_ports():
-    ports = []
-    try:
-        with open("docker-compose.yml", "r") as f:
-            compose_config = yaml.safe_load(f)
-
-        for service_name, service_config in compose_config.get("services", {}).items():
-            if service_name.startswith("secondary"):
-                for port_mapping in service_config.get("ports", []):
-                    host_port = int(port_mapping.split(":")[0])
-                    if host_port != MASTER_PORT and host_port not in ports:
-                        ports.append(host_port)
-        ports.sort()
-    except (FileNotFoundError, yaml.YAMLError):
-        pass
-
-    if not ports:
-        try:
-            cmd = ["docker", "compose", "ps", "--format", "json"]
-            result = subprocess.run(cmd, capture_output=True, text=True, check=True)  # nosec B603 - safe command
-            containers_info = json.loads(result.stdout)
-            for container in containers_info:
-                if container.get("Service", "").startswith("secondary"):
-                    for publisher in container.get("Publishers", []):
-                        host_port = publisher.get("PublishedPort")
-                        if host_port and host_port != MASTER_PORT and host_port not in ports:
-                            ports.append(host_port)
-            ports.sort()
-        except (subprocess.CalledProcessError, json.JSONDecodeError):
-            pass
+import functools
+from concurrent.futures import ThreadPoolExecutor
 
-    if not ports:
-        return [8001, 8002]
+from tests._cluster import MASTER, SESSION, _uniq, json_loads, secondaries
 
-    return ports
 
+def _get(url: str):
+    return json_loads(SESSION.get(url, timeout=5).content)
 
-SECONDARY_PORTS = get_secondary_ports()
-SECONDARIES = [f"{BASE}:{p}" for p in SECONDARY_PORTS]
 
+def _post(url: str, json: dict):
+    return json_loads(SESSION.post(url, json=json, timeout=10).content)
 
-def _get(url: str):
-    return requests.get(url, timeout=5).json()
 
+def _get_all(urls: list) -> list:
+    # Fan out so collecting from N nodes costs the slowest node, not the sum
+    with ThreadPoolExecutor(max_workers=max(1, len(urls))) as ex:
+        return list(ex.map(_get, urls))
 
-def _post(url: str, json: dict):
-    return requests.post(url, json=json, timeout=10).json()
+
+@functools.lru_cache(maxsize=None)
+def _health(url: str) -> dict:
+    # delay_ms is fixed per secondary for the whole run, so one lookup per node is enough
+    return _get(f"{url}/health")
 
 
 def test_health():
     j = _get(f"{MASTER}/health")
     assert j["status"] == "ok"
 
-    for u in SECONDARIES:
-        j = _get(f"{u}/health")
+    for j in _get_all([f"{u}/health" for u in secondaries()]):
         assert j["status"] == "ok"
 
 
 def test_blocking_and_consistency():
     # Test backward compatibility: no w parameter = all secondaries
-    t0 = time.time()
+    t0 = time.monotonic()
     r = _post(f"{MASTER}/messages", {"msg": "pytest"})
     dur = r["duration_ms"]
-    expected_w = len(SECONDARIES) + 1
+    expected_w = len(secondaries()) + 1
     assert r.get("w") == expected_w, f"Write concern should default to {expected_w}, got {r.get('w')}"
-    assert len(r["acks"]) == len(SECONDARIES), f"Expected {len(SECONDARIES)} ACKs, got {len(r['acks'])}"
+    assert len(r["acks"]) == len(secondaries()), f"Expected {len(secondaries())} ACKs, got {len(r['acks'])}"
 
     max_delay = 0
-    for s_url in SECONDARIES:
+    for s_url in secondaries():
         try:
-            health_info = _get(f"{s_url}/health")
-            max_delay = max(max_delay, health_info.get("delay_ms", 0))
+            max_delay = max(max_delay, _health(s_url).get("delay_ms", 0))
         except Exception:
             pass
 
@@ -90,14 +54,13 @@ def test_blocking_and_consistency():
         expected_min_dur = 0
     assert dur >= expected_min_dur, f"Expected duration >= {expected_min_dur}ms, got {dur}ms"
 
-    t1 = time.time()
+    t1 = time.monotonic()
     assert (t1 - t0) >= (max_delay / 1000.0 - 0.2), f"Real time too short: {t1 - t0}s"
 
     m = _get(f"{MASTER}/messages")["messages"]
 
-    for u in SECONDARIES:
-        s = _get(f"{u}/messages")["messages"]
-        assert m == s, f"Consistency mismatch with {u}"
+    for u, j in zip(secondaries(), _get_all([f"{u}/messages" for u in secondaries()])):
+        assert m == j["messages"], f"Consistency mismatch with {u}"
 
 
 def test_write_concern_w1():
@@ -110,7 +73,7 @@ def test_write_concern_w1():
 
 def test_write_concern_w2():
     # w=2: master + 1 secondary
-    if len(SECONDARIES) < 1:
+    if len(secondaries()) < 1:
         return  # skip if no secondaries
 
     r = _post(f"{MASTER}/messages", {"msg": "w2_test", "w": 2})
@@ -120,10 +83,10 @@ def test_write_concern_w2():
 
 def test_eventual_consistency():
     # Test that w=1 can cause temporary inconsistency, but converges eventually
-    if len(SECONDARIES) < 1:
+    if len(secondaries()) < 1:
         return
 
-    unique_msg = f"eventual_test_{int(time.time() * 1000)}"
+    unique_msg = _uniq("eventual_test")
     _post(f"{MASTER}/messages", {"msg": unique_msg, "w": 1})
 
     # Master should have the message immediately
@@ -133,10 +96,9 @@ def test_eventual_consistency():
     # Discover delayed secondaries and track max delay
     delayed_secondaries = []
     max_delay = 0
-    for sec_url in SECONDARIES:
+    for sec_url in secondaries():
         try:
-            health_info = _get(f"{sec_url}/health")
-            delay = health_info.get("delay_ms", 0)
+            delay = _health(sec_url).get("delay_ms", 0)
             if delay > 0:
                 delayed_secondaries.append(sec_url)
             max_delay = max(max_delay, delay)
@@ -145,8 +107,8 @@ def test_eventual_consistency():
 
     # Immediately check secondaries for temporary inconsistency
     missing_count = 0
-    for sec_url in SECONDARIES:
-        sec_msgs = _get(f"{sec_url}/messages")["messages"]
+    for sec_url, j in zip(secondaries(), _get_all([f"{u}/messages" for u in secondaries()])):
+        sec_msgs = j["messages"]
         if unique_msg not in sec_msgs:
             missing_count += 1
 
@@ -167,8 +129,8 @@ def test_eventual_consistency():
         time.sleep(2)
 
     # After waiting, all secondaries should have the message
-    for sec_url in SECONDARIES:
-        sec_msgs = _get(f"{sec_url}/messages")["messages"]
+    for sec_url, j in zip(secondaries(), _get_all([f"{u}/messages" for u in secondaries()])):
+        sec_msgs = j["messages"]
         assert unique_msg in sec_msgs, (
             f"Secondary {sec_url} should eventually have the message "
             "after async replication"
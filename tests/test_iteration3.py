@@ -1,115 +1,28 @@
 """
 Iteration 3 Tests: Retry, Blocking, Catch-up, Total Order
 """
-import os
 import time
-import json
 import threading
-import subprocess
-from typing import List
-
-import requests
-import yaml
-
-BASE = "http://localhost"
-MASTER_PORT = int(os.environ.get("MASTER_PORT", "8000"))
-MASTER = f"{BASE}:{MASTER_PORT}"
-
-
-def get_secondary_ports() -> List[int]:
-    """Discover secondary ports from docker-compose.yml or docker compose ps"""
-    ports: List[int] = []
-    try:
-        with open("docker-compose.yml", "r") as f:
-            compose = yaml.safe_load(f)
-
-        for svc_name, cfg in compose.get("services", {}).items():
-            if svc_name.startswith("secondary"):
-                for port_mapping in cfg.get("ports", []):
-                    if isinstance(port_mapping, str):
-                        host_port = int(port_mapping.split(":")[0])
-                    else:
-                        host_port = port_mapping.get("published", 0)
-                    if host_port != MASTER_PORT and host_port not in ports:
-                        ports.append(host_port)
-        ports.sort()
-    except (FileNotFoundError, yaml.YAMLError, KeyError, ValueError):
-        pass
-
-    if not ports:
-        try:
-            cmd = ["docker", "compose", "ps", "--format", "json"]
-            result = subprocess.run(
-                cmd, capture_output=True, text=True, check=True  # nosec B603
-            )
-            lines = result.stdout.strip().split("\n")
-            for line in lines:
-                if not line:
-                    continue
-                c = json.loads(line)
-                if c.get("Service", "").startswith("secondary"):
-                    for pub in c.get("Publishers", []):
-                        host_port = pub.get("PublishedPort")
-                        if host_port and host_port != MASTER_PORT and host_port not in ports:
-                            ports.append(host_port)
-            ports.sort()
-        except (subprocess.CalledProcessError, json.JSONDecodeError, KeyError):
-            pass
-
-    # Fallback for local dev
-    if not ports:
-        return [8001, 8002]
-
-    return ports
-
-
-SECONDARY_PORTS = get_secondary_ports()
-SECONDARIES = [f"{BASE}:{p}" for p in SECONDARY_PORTS]
+
+import pytest
+
+from tests._cluster import MASTER, SESSION, json_loads, start_secondary2, wait_until
 
 
 def _get(url: str):
     """GET request helper"""
-    return requests.get(url, timeout=5).json()
+    return json_loads(SESSION.get(url, timeout=5).content)
 
 
 def _post(url: str, json_body: dict):
     """POST request helper"""
-    r = requests.post(url, json=json_body, timeout=60)
+    r = SESSION.post(url, json=json_body, timeout=60)
     r.raise_for_status()
     return r
 
 
-def stop_secondary2():
-    """Stop secondary2 container"""
-    subprocess.run(
-        ["docker", "compose", "stop", "secondary2"],
-        capture_output=True,
-        text=True,
-    )
-
-
-def start_secondary2():
-    """Start secondary2 container and wait for it to be healthy"""
-    subprocess.run(
-        ["docker", "compose", "start", "secondary2"],
-        capture_output=True,
-        text=True,
-    )
-    # Wait for health check
-    s2_url = SECONDARIES[1] if len(SECONDARIES) > 1 else SECONDARIES[0]
-    deadline = time.time() + 30
-    while time.time() < deadline:
-        try:
-            resp = requests.get(f"{s2_url}/health", timeout=2)
-            if resp.status_code == 200:
-                return
-        except requests.RequestException:
-            pass
-        time.sleep(1)
-    raise TimeoutError("Secondary2 did not become healthy in time")
-
-
-def test_iter3_self_check_scenario():
+@pytest.mark.slow
+def test_iter3_self_check_scenario(stopped_secondary2):
     """
     Self-check acceptance test:
     Start M+S1, keep S2 down.
@@ -119,10 +32,6 @@ def test_iter3_self_check_scenario():
     Msg4 (w=1)   -> OK
     After S2 up  -> S2 has [Msg1, Msg2, Msg3, Msg4]
     """
-    # Ensure secondary2 is stopped
-    stop_secondary2()
-    time.sleep(2)
-
     # Msg1, w=1
     r1 = _post(f"{MASTER}/messages", {"msg": "Msg1", "w": 1})
     body1 = r1.json()
@@ -144,17 +53,19 @@ def test_iter3_self_check_scenario():
         except Exception as e:
             msg3_result["error"] = e
 
+    logged_before = _get(f"{MASTER}/health")["count"]
     t_msg3 = threading.Thread(target=post_msg3)
     t_msg3.start()
 
-    # Give msg3 time to reach the "waiting for S2" state
-    time.sleep(1)
+    # Msg3 is in the "waiting for S2" state once master has appended it
+    assert wait_until(lambda: _get(f"{MASTER}/health")["count"] > logged_before, timeout=2), \
+        "w=3 write was never appended by master"
     assert t_msg3.is_alive(), "Msg3 (w=3) should be blocked while S2 is down"
 
     # Msg4, w=1 should still succeed quickly
-    start_w1 = time.time()
+    start_w1 = time.monotonic()
     r4 = _post(f"{MASTER}/messages", {"msg": "Msg4", "w": 1})
-    elapsed_w1 = time.time() - start_w1
+    elapsed_w1 = time.monotonic() - start_w1
     body4 = r4.json()
     assert body4["w"] == 1, f"Expected w=1, got {body4.get('w')}"
     assert elapsed_w1 < 2, f"w=1 write must not be blocked by w=3 request (took {elapsed_w1}s)"
@@ -163,7 +74,7 @@ def test_iter3_self_check_scenario():
     assert t_msg3.is_alive(), "Msg3 should still be blocked"
 
     # Start S2 so that retries can succeed and Msg3 can complete
-    start_secondary2()
+    assert start_secondary2(), "Secondary2 did not become healthy in time"
 
     t_msg3.join(timeout=30)
     assert not t_msg3.is_alive(), "Msg3 (w=3) should finish after S2 is up"
@@ -173,29 +84,32 @@ def test_iter3_self_check_scenario():
     assert len(body3.get("acks", [])) >= 2, "w=3 should get ACKs from both secondaries"
 
     # Eventually, S2 should have all four messages in order
-    s2_url = SECONDARIES[1] if len(SECONDARIES) > 1 else SECONDARIES[0]
-
-    deadline = time.time() + 30
-    final_msgs = []
-    while time.time() < deadline:
-        final_msgs = _get(f"{s2_url}/messages")["messages"]
-        test_msgs = [m for m in final_msgs if m in ["Msg1", "Msg2", "Msg3", "Msg4"]]
-        if test_msgs == ["Msg1", "Msg2", "Msg3", "Msg4"]:
-            break
-        time.sleep(1)
-
-    test_msgs = [m for m in final_msgs if m in ["Msg1", "Msg2", "Msg3", "Msg4"]]
-    assert test_msgs == ["Msg1", "Msg2", "Msg3", "Msg4"], \
-        f"S2 messages mismatch: expected ['Msg1', 'Msg2', 'Msg3', 'Msg4'], got {test_msgs}"
-
-
-def test_iter3_parallel_clients_w3_blocked_w1_free():
+    s2_url = stopped_secondary2
+    expected = ["Msg1", "Msg2", "Msg3", "Msg4"]
+    wanted = frozenset(expected)
+    test_msgs = []
+    seen_count = -1
+
+    def s2_converged():
+        nonlocal test_msgs, seen_count
+        # /health count only moves when S2 stores a message, so skip re-reading the full log until it does
+        count = _get(f"{s2_url}/health")["count"]
+        if count == seen_count:
+            return False
+        seen_count = count
+        test_msgs = [m for m in _get(f"{s2_url}/messages")["messages"] if m in wanted]
+        return test_msgs == expected
+
+    wait_until(s2_converged, timeout=30)
+    assert test_msgs == expected, \
+        f"S2 messages mismatch: expected {expected}, got {test_msgs}"
+
+
+@pytest.mark.slow
+def test_iter3_parallel_clients_w3_blocked_w1_free(stopped_secondary2):
     """
     Explicitly verify that a w=3 request doesn't block a concurrent w=1 request.
     """
-    stop_secondary2()
-    time.sleep(2)
-
     w3_result = {"response": None, "error": None}
 
     def post_w3():
@@ -204,14 +118,17 @@ def test_iter3_parallel_clients_w3_blocked_w1_free():
         except Exception as e:
             w3_result["error"] = e
 
+    logged_before = _get(f"{MASTER}/health")["count"]
     t = threading.Thread(target=post_w3)
     t.start()
-    time.sleep(1)
+    # The w=3 write is waiting for S2 once master has appended it
+    assert wait_until(lambda: _get(f"{MASTER}/health")["count"] > logged_before, timeout=2), \
+        "w=3 write was never appended by master"
     assert t.is_alive(), "w=3 request should be waiting for S2"
 
-    start = time.time()
+    start = time.monotonic()
     r = _post(f"{MASTER}/messages", {"msg": "Parallel_Msg4", "w": 1})
-    elapsed = time.time() - start
+    elapsed = time.monotonic() - start
     assert r.json()["w"] == 1
     assert elapsed < 2.0, f"w=1 request must complete fast even while w=3 is blocked (took {elapsed}s)"
 
@@ -219,7 +136,7 @@ def test_iter3_parallel_clients_w3_blocked_w1_free():
     assert t.is_alive(), "w=3 should still be blocked"
 
     # Bring S2 back and ensure w=3 eventually completes
-    start_secondary2()
+    assert start_secondary2(), "Secondary2 did not become healthy in time"
     t.join(timeout=30)
     assert not t.is_alive(), "w=3 request must finish after S2 rejoin"
     assert w3_result["response"] is not None, "w=3 request should have completed"
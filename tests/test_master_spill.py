@@ -0,0 +1,93 @@
+"""
+Master disk spill (HOT_WINDOW > 0) and GET /messages?since=N, through Flask's test client
+"""
+import importlib.util
+import os
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("flask")
+pytest.importorskip("orjson")
+
+MASTER_APP = Path(__file__).resolve().parent.parent / "master" / "app.py"
+HOT_WINDOW = 3
+
+
+@pytest.fixture(scope="module")
+def master(tmp_path_factory):
+    """A fresh master module with no secondaries and a 3-message hot window; spills only when asked"""
+    env = {
+        "HOT_WINDOW": str(HOT_WINDOW),
+        "SPILL_PATH": str(tmp_path_factory.mktemp("spill") / "log.bin"),
+        "SPILL_INTERVAL": "3600",
+        "SECONDARIES": "",
+    }
+    saved = {k: os.environ.get(k) for k in env}
+    os.environ.update(env)
+    try:
+        spec = importlib.util.spec_from_file_location("master_app_spill", MASTER_APP)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+    finally:
+        for k, v in saved.items():
+            if v is None:
+                os.environ.pop(k, None)
+            else:
+                os.environ[k] = v
+    return module
+
+
+@pytest.fixture(scope="module")
+def client(master):
+    c = master.app.test_client()
+    for i in range(1, 6):
+        assert c.post("/messages", json={"msg": f"m{i}", "w": 1}).status_code == 201
+    master.spill_excess()
+    return c
+
+
+def _messages(resp) -> list:
+    assert resp.status_code == 200
+    return resp.get_json()["messages"]
+
+
+def test_spill_keeps_only_hot_window_in_memory(master, client):
+    assert [seq for seq, _ in master.MESSAGES] == [3, 4, 5]
+    assert list(master.SPILL.read(0, 3)) == [(1, "m1"), (2, "m2")]
+    assert master.log_length() == 5
+
+
+def test_full_log_spans_spill_and_memory(client):
+    assert _messages(client.get("/messages")) == ["m1", "m2", "m3", "m4", "m5"]
+
+
+@pytest.mark.parametrize("since, expected", [
+    (1, ["m2", "m3", "m4", "m5"]),  # since + 1 < head: starts in the spill file
+    (2, ["m3", "m4", "m5"]),        # since + 1 == head: memory only
+    (4, ["m5"]),
+    (5, []),                        # at the tail
+    (99, []),                       # past the tail
+])
+def test_since(client, since, expected):
+    assert _messages(client.get(f"/messages?since={since}")) == expected
+
+
+def test_etag_with_spill(master, client):
+    first = client.get("/messages")
+    etag = first.headers["ETag"]
+    assert client.get("/messages", headers={"If-None-Match": etag}).status_code == 304
+
+    assert client.post("/messages", json={"msg": "m6", "w": 1}).status_code == 201
+    master.spill_excess()
+    second = client.get("/messages", headers={"If-None-Match": etag})
+    assert second.headers["ETag"] != etag
+    assert _messages(second) == ["m1", "m2", "m3", "m4", "m5", "m6"]
+
+
+def test_default_spill_file_is_per_process(master):
+    first = master.LogSpill()
+    first.append([(1, "kept")])
+    second = master.LogSpill()
+    assert first.path != second.path
+    assert list(first.read(0, 2)) == [(1, "kept")]
@@ -0,0 +1,43 @@
+"""
+Secondary POST /replicate body decoding, through Flask's test client
+"""
+import gzip
+import importlib.util
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("flask")
+orjson = pytest.importorskip("orjson")
+
+SECONDARY_APP = Path(__file__).resolve().parent.parent / "secondary" / "app.py"
+
+
+@pytest.fixture(scope="module")
+def client():
+    spec = importlib.util.spec_from_file_location("secondary_app_replicate", SECONDARY_APP)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.app.test_client()
+
+
+def _gzip_body() -> bytes:
+    return gzip.compress(orjson.dumps({"seq": 1, "msg": "x" * 200}))
+
+
+def _corrupt_deflate() -> bytes:
+    # Flip bytes just past the 10-byte gzip header, so the deflate blocks themselves are invalid
+    body = _gzip_body()
+    return body[:10] + bytes(b ^ 0xFF for b in body[10:30]) + body[30:]
+
+
+@pytest.mark.parametrize("body", [
+    _corrupt_deflate(),
+    _gzip_body()[:-12],  # truncated stream
+    b"not gzip at all",
+], ids=["corrupt-deflate", "truncated", "not-gzip"])
+def test_undecodable_gzip_body_is_400(client, body):
+    resp = client.post("/replicate", data=body,
+                       headers={"Content-Encoding": "gzip", "Content-Type": "application/json"})
+    assert resp.status_code == 400
+    assert "error" in resp.get_json()